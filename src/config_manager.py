@@ -3,8 +3,10 @@
 负责保存和读取应用程序的配置信息
 """
 
+import atexit
 import json
 import os
+import threading
 from typing import Dict, Any
 
 
@@ -13,6 +15,14 @@ class ConfigManager:
 
     def __init__(self, config_file: str = "settings.json"):
         self.config_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), config_file)
+        # 内存缓存，避免每次get/set都重新读取磁盘
+        self._cache = None
+        self._cache_mtime = 0
+        # 延迟写盘：高频更新（如窗口几何）合并为一次写入
+        self._dirty = False
+        self._flush_timer = None
+        self._flush_lock = threading.Lock()
+        atexit.register(self._flush)
         self.default_config = {
             "repo_path": "",
             "old_sha": "",
@@ -24,17 +34,31 @@ class ConfigManager:
         }
 
     def load_config(self) -> Dict[str, Any]:
-        """加载配置文件"""
+        """加载配置文件（优先返回内存缓存，按mtime判断是否需要重新读取）"""
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    # 合并默认配置和加载的配置
-                    merged_config = self.default_config.copy()
-                    merged_config.update(config)
-                    return merged_config
+            try:
+                mtime = os.stat(self.config_file).st_mtime
+            except OSError:
+                mtime = 0
+
+            # 文件未变化时直接返回缓存，省去重复的读取和解析
+            if self._cache is not None and mtime == self._cache_mtime:
+                return self._cache
+
+            if mtime:
+                with open(self.config_file, 'rb') as f:
+                    data = f.read()
+                # 一次性读取后再解析，比json.load(f)的流式读取更快
+                config = json.loads(data)
+                # 合并默认配置和加载的配置
+                merged_config = self.default_config.copy()
+                merged_config.update(config)
             else:
-                return self.default_config.copy()
+                merged_config = self.default_config.copy()
+
+            self._cache = merged_config
+            self._cache_mtime = mtime
+            return merged_config
         except Exception as e:
             print(f"加载配置文件失败: {e}")
             return self.default_config.copy()
@@ -42,18 +66,68 @@ class ConfigManager:
     def save_config(self, config: Dict[str, Any]) -> bool:
         """保存配置文件"""
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            # 先序列化再一次写入，比json.dump(f)的流式写入更快
+            data = json.dumps(config, ensure_ascii=False, indent=2).encode('utf-8')
+            with open(self.config_file, 'wb') as f:
+                f.write(data)
+            # 同步缓存，避免下次load_config重新读取刚写入的内容
+            self._cache = config
+            try:
+                self._cache_mtime = os.stat(self.config_file).st_mtime
+            except OSError:
+                self._cache_mtime = 0
             return True
         except Exception as e:
             print(f"保存配置文件失败: {e}")
             return False
 
     def update_config(self, updates: Dict[str, Any]) -> bool:
-        """更新配置文件"""
+        """更新配置项（合并到内存后延迟写盘）
+
+        高频更新只修改内存并安排一次0.5秒后的写入，连续的更新被
+        合并为一次磁盘写；进程退出时由atexit兜底落盘。
+        """
         current_config = self.load_config()
         current_config.update(updates)
-        return self.save_config(current_config)
+        self._cache = current_config
+        self._dirty = True
+        self._schedule_flush()
+        return True
+
+    def _schedule_flush(self):
+        """重置延迟写盘定时器"""
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+            timer = threading.Timer(0.5, self._flush)
+            timer.daemon = True
+            self._flush_timer = timer
+            timer.start()
+
+    def _flush(self):
+        """将待写入的配置落盘（定时器触发或进程退出时调用）"""
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            config = self._cache
+        if config is not None:
+            self.save_config(config)
+
+    def load_all(self) -> Dict[str, Any]:
+        """一次性获取全部配置项
+
+        需要连续读取多个键时（如启动时恢复界面状态），应使用本方法
+        解构，而不是逐键调用get触发多次加载。
+        """
+        return self.load_config()
+
+    def update_many(self, updates: Dict[str, Any]) -> bool:
+        """批量更新多个配置项，合并为一次写盘（替代连续的set调用）"""
+        return self.update_config(updates)
 
     def get(self, key: str, default: Any = None) -> Any:
         """获取配置项"""
@@ -3,12 +3,30 @@
 负责文件操作、目录结构和路径处理
 """
 
+import functools
 import os
 import shutil
+import threading
 import tkinter.messagebox as messagebox
 from typing import List, Tuple, Optional
 from pathlib import Path
 
+# 文件大小单位表，与format_file_size的1024进制对应
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# 反斜杠到正斜杠的单字符映射，translate走C层循环，批量调用时比replace快
+_SLASH_TRANS = str.maketrans('\\', '/')
+
+# 原样写入字节的open标志：Windows的CRT默认按文本模式打开fd，
+# 会把LF翻译成CRLF，必须显式加O_BINARY（其他平台无此标志）
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+
+@functools.lru_cache(maxsize=32)
+def _resolved(path: str) -> Path:
+    """缓存Path.resolve的结果，循环中对同一仓库路径只做一次文件系统解析"""
+    return Path(path).resolve()
+
 
 class FileManager:
     """文件操作管理器"""
@@ -17,6 +35,10 @@ class FileManager:
         self.copied_files = 0
         self.failed_files = []
         self.current_operation = ""
+        # 已确认存在的目标目录，避免重复makedirs
+        self._known_dirs = set()
+        # 统计信息的并发保护，供多线程提取使用
+        self._lock = threading.Lock()
 
     def prepare_output_directory(self, output_path: str, folder_name: str,
                                 force_overwrite: bool = False) -> Tuple[bool, str]:
@@ -40,22 +62,17 @@ class FileManager:
 
                     if response is None:  # 取消
                         return False, "用户取消操作"
-                    elif not response:  # 否，保留现有文件
-                        # 检查old和new子目录，不存在则创建
-                        old_dir = os.path.join(full_output_path, "old")
-                        new_dir = os.path.join(full_output_path, "new")
-                        os.makedirs(old_dir, exist_ok=True)
-                        os.makedirs(new_dir, exist_ok=True)
-                        return True, ""
-                    else:  # 是，删除并重新创建
+                    elif response:  # 是，删除并重新创建
                         shutil.rmtree(full_output_path)
+                        # 刚删除的目录不能再算"已创建"，清空目录缓存，
+                        # 否则后续复制会跳过makedirs而写入失败
+                        with self._lock:
+                            self._known_dirs.clear()
+                    # 否：保留现有文件，仅补齐old/new子目录
 
-            # 创建目录结构
-            os.makedirs(full_output_path, exist_ok=True)
-            old_dir = os.path.join(full_output_path, "old")
-            new_dir = os.path.join(full_output_path, "new")
-            os.makedirs(old_dir, exist_ok=True)
-            os.makedirs(new_dir, exist_ok=True)
+            # 创建目录结构（makedirs会连带创建父目录，无需单独创建full_output_path）
+            os.makedirs(os.path.join(full_output_path, "old"), exist_ok=True)
+            os.makedirs(os.path.join(full_output_path, "new"), exist_ok=True)
 
             return True, ""
 
@@ -68,20 +85,29 @@ class FileManager:
         自动创建必要的目录结构
         """
         try:
-            # 确保目标目录存在
+            # 确保目标目录存在（已创建过的目录跳过makedirs）
             target_dir = os.path.dirname(target_path)
-            if target_dir:
+            if target_dir and target_dir not in self._known_dirs:
                 os.makedirs(target_dir, exist_ok=True)
+                self._known_dirs.add(target_dir)
 
-            # 写入文件
-            with open(target_path, 'wb') as f:
-                f.write(content)
-
-            self.copied_files += 1
+            # 直接走os.open/os.write，绕过缓冲写入器的额外开销；
+            # os.write可能部分写入，循环直到全部落盘
+            fd = os.open(target_path, _WRITE_FLAGS, 0o644)
+            try:
+                view = memoryview(content)
+                while view:
+                    written = os.write(fd, view)
+                    view = view[written:]
+            finally:
+                os.close(fd)
+
+            with self._lock:
+                self.copied_files += 1
             return True
 
         except Exception as e:
-            self.failed_files.append((target_path, str(e)))
+            self.record_failure(target_path, str(e))
             return False
 
     def copy_file_with_structure(self, content: bytes, base_output_path: str,
@@ -102,22 +128,74 @@ class FileManager:
             return self.copy_file_to_directory(content, target_path)
 
         except Exception as e:
-            self.failed_files.append((file_path, str(e)))
+            self.record_failure(file_path, str(e))
             return False
 
+    def copy_stream_with_structure(self, src, size: int, base_output_path: str,
+                                   file_path: str, version: str) -> bool:
+        """按原目录结构从可读流复制恰好size字节
+
+        与copy_file_with_structure等价，但内容来自流（如cat-file管道），
+        按1MB分块写入，大文件不会整块驻留在Python堆中。
+        """
+        try:
+            target_path = os.path.normpath(
+                os.path.join(base_output_path, version, file_path))
+
+            # 确保目标目录存在（已创建过的目录跳过makedirs）
+            target_dir = os.path.dirname(target_path)
+            if target_dir and target_dir not in self._known_dirs:
+                os.makedirs(target_dir, exist_ok=True)
+                self._known_dirs.add(target_dir)
+
+            fd = os.open(target_path, _WRITE_FLAGS, 0o644)
+            try:
+                remaining = size
+                while remaining > 0:
+                    chunk = src.read(min(1 << 20, remaining))
+                    if not chunk:
+                        raise Exception(f"数据流提前结束，缺少{remaining}字节")
+                    # os.write可能部分写入，循环直到整块落盘
+                    view = memoryview(chunk)
+                    while view:
+                        written = os.write(fd, view)
+                        view = view[written:]
+                    remaining -= len(chunk)
+            finally:
+                os.close(fd)
+
+            with self._lock:
+                self.copied_files += 1
+            return True
+
+        except Exception as e:
+            self.record_failure(file_path, str(e))
+            return False
+
+    def record_failure(self, file_path: str, error: str):
+        """线程安全地记录失败的文件"""
+        with self._lock:
+            self.failed_files.append((file_path, error))
+
     def normalize_path(self, path: str) -> str:
         """标准化路径，处理不同平台的路径分隔符"""
-        return os.path.normpath(path).replace('\\', '/')
+        # 快速路径：git输出的干净POSIX路径（无反斜杠、无冗余分隔符、
+        # 无.或..分量），normpath不会改变它们，直接返回
+        if (path and '\\' not in path and '//' not in path and '..' not in path
+                and '/./' not in path and not path.startswith('./')
+                and not path.endswith('/') and path != '.'):
+            return path
+        return os.path.normpath(path).translate(_SLASH_TRANS)
 
     def get_relative_path(self, file_path: str, repo_path: str) -> str:
         """获取文件相对于仓库根目录的路径"""
         try:
-            # 使用Path对象处理相对路径
-            repo_path = Path(repo_path).resolve()
-            file_path = Path(file_path).resolve()
+            # 仓库路径在循环中保持不变，解析结果走缓存
+            resolved_repo = _resolved(repo_path)
+            resolved_file = Path(file_path).resolve()
 
             # 计算相对路径
-            relative_path = file_path.relative_to(repo_path)
+            relative_path = resolved_file.relative_to(resolved_repo)
             return str(relative_path).replace('\\', '/')
         except ValueError:
             # 如果计算相对路径失败，返回原始路径
@@ -159,30 +237,41 @@ class FileManager:
 
     def get_directory_size(self, path: str) -> int:
         """获取目录大小（字节）"""
+        # os.scandir的DirEntry自带缓存的stat信息，
+        # 每个文件只需一次系统调用（os.walk + getsize为每个文件多次stat）；
+        # 用显式栈代替递归，深目录树不受递归深度限制
         total_size = 0
-        try:
-            for dirpath, dirnames, filenames in os.walk(path):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    if os.path.exists(filepath):
-                        total_size += os.path.getsize(filepath)
-        except:
-            pass
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_file(follow_symlinks=False):
+                                total_size += entry.stat(follow_symlinks=False).st_size
+                            elif entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
         return total_size
 
     def format_file_size(self, size_bytes: int) -> str:
         """格式化文件大小显示"""
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size_bytes < 1024:
-                return f"{size_bytes:.1f} {unit}"
-            size_bytes /= 1024
-        return f"{size_bytes:.1f} TB"
+        if size_bytes <= 0:
+            return "0.0 B"
+        # 用bit_length直接定位单位，省去逐级除法的循环
+        i = min(4, (int(size_bytes).bit_length() - 1) // 10)
+        return f"{size_bytes / (1 << (10 * i)):.1f} {_SIZE_UNITS[i]}"
 
     def reset_statistics(self):
         """重置统计信息"""
         self.copied_files = 0
         self.failed_files = []
         self.current_operation = ""
+        self._known_dirs = set()
 
     def get_statistics(self) -> dict:
         """获取操作统计信息"""
@@ -213,17 +302,21 @@ class FileManager:
         if not content:
             return False
 
-        # 只检查前sample_size字节
-        sample = content[:sample_size]
+        # 只检查前sample_size字节；用find的范围参数避免切片拷贝，
+        # 也允许调用方直接传入mmap上的memoryview
+        n = min(sample_size, len(content))
+        if isinstance(content, memoryview):
+            # memoryview没有find方法，只物化前n字节的样本
+            content = bytes(content[:n])
 
         # 检查是否包含空字节（二进制文件的典型特征）
-        if b'\x00' in sample:
+        if content.find(b'\x00', 0, n) != -1:
             return True
 
         # 检查文本文件中不常见的控制字符
         try:
             # 尝试解码为UTF-8
-            sample.decode('utf-8')
+            bytes(content[:n]).decode('utf-8')
             return False
         except UnicodeDecodeError:
             return True
@@ -3,14 +3,19 @@ Git引擎模块 (GitEngine)
 负责调用PortableGit执行Git命令，处理差异分析和文件提取
 """
 
+import functools
 import os
 import subprocess
 import re
-from typing import List, Dict, Tuple, Optional, NamedTuple
+import threading
+from typing import List, Dict, Tuple, Optional, Iterator, NamedTuple
 from dataclasses import dataclass
 
+# 重命名/复制状态行（如R100）的匹配模式，预编译避免热循环内的缓存查找
+_RC_RE = re.compile(r'([RC])(\d+)')
 
-@dataclass
+
+@dataclass(slots=True)
 class DiffEntry:
     """Git差异条目"""
     status: str  # M=修改, A=新增, D=删除, T=类型变更, R=重命名
@@ -19,7 +24,7 @@ class DiffEntry:
     similarity: int = 0  # 相似度百分比（重命名时使用）
 
 
-@dataclass
+@dataclass(slots=True)
 class SubmoduleInfo:
     """子模块信息"""
     path: str
@@ -29,6 +34,139 @@ class SubmoduleInfo:
     new_commit: Optional[str] = None
 
 
+class _LimitedReader:
+    """限定字节数的只读视图，跟踪已消费量以便出错时排空管道"""
+
+    def __init__(self, raw, remaining: int):
+        self._raw = raw
+        self.remaining = remaining
+
+    def read(self, n: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b''
+        if n < 0 or n > self.remaining:
+            n = self.remaining
+        chunk = self._raw.read(n)
+        self.remaining -= len(chunk)
+        return chunk
+
+
+class BatchCatFile:
+    """长驻的git cat-file --batch子进程，批量提取文件内容
+
+    相比每个文件fork一次git show，所有提取共用同一个进程，
+    消除N-1次进程启动和仓库打开的开销。
+    """
+
+    # 超过该大小的blob不整块载入内存，改为流式交给调用方处理
+    LARGE_BLOB_THRESHOLD = 8 << 20
+
+    def __init__(self, engine: 'GitEngine'):
+        self._proc = subprocess.Popen(
+            [engine.git_exe, 'cat-file', '--batch'],
+            cwd=engine.repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=engine._git_env
+        )
+        # 管道上的请求/响应必须成对，多线程提取时串行化访问
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _skip_payload(stdout, count: int):
+        """读掉并丢弃count字节（用于跳过非blob对象的内容负载）"""
+        while count > 0:
+            chunk = stdout.read(min(1 << 20, count))
+            if not chunk:
+                break
+            count -= len(chunk)
+
+    def fetch(self, sha: str, file_path: str) -> bytes:
+        """获取指定SHA和路径的文件内容（对象不存在时返回空字节，线程安全）"""
+        proc = self._proc
+        with self._lock:
+            proc.stdin.write(f"{sha}:{file_path}\n".encode('utf-8'))
+            proc.stdin.flush()
+
+            # 响应格式: <sha> <type> <size>\n<内容>\n 或 <对象名> missing\n
+            header = proc.stdout.readline()
+            if not header:
+                raise Exception("git cat-file进程意外退出")
+
+            parts = header.split()
+            if len(parts) < 3 or parts[1] != b'blob':
+                # 存在但非blob的对象（如gitlink指向的commit）同样带有
+                # 内容负载，必须连同结尾换行符一起读掉，否则管道失步，
+                # 此后的所有响应都会错位
+                if len(parts) >= 3:
+                    self._skip_payload(proc.stdout, int(parts[2]) + 1)
+                return b''
+
+            size = int(parts[2])
+            content = proc.stdout.read(size)
+            proc.stdout.read(1)  # 跳过内容后的换行符
+        return content
+
+    def fetch_or_stream(self, sha: str, file_path: str, sink) -> Optional[bytes]:
+        """获取文件内容；小blob返回bytes，大blob流式交给sink后返回None
+
+        超过LARGE_BLOB_THRESHOLD的内容不整块进入Python堆，而是在持有
+        管道锁的情况下调用sink(readable, size)，由调用方分块消费。
+        sink未读完或中途抛错时剩余字节会被排空，保证管道不失步。
+        对象不存在时返回空字节。
+        """
+        proc = self._proc
+        with self._lock:
+            proc.stdin.write(f"{sha}:{file_path}\n".encode('utf-8'))
+            proc.stdin.flush()
+
+            header = proc.stdout.readline()
+            if not header:
+                raise Exception("git cat-file进程意外退出")
+
+            parts = header.split()
+            if len(parts) < 3 or parts[1] != b'blob':
+                # 同fetch：非blob对象的负载必须读掉，保证管道同步
+                if len(parts) >= 3:
+                    self._skip_payload(proc.stdout, int(parts[2]) + 1)
+                return b''
+
+            size = int(parts[2])
+            if size > self.LARGE_BLOB_THRESHOLD:
+                limited = _LimitedReader(proc.stdout, size)
+                try:
+                    sink(limited, size)
+                finally:
+                    # 无论sink是否读完都排空剩余字节，再跳过结尾换行符
+                    while limited.read(1 << 20):
+                        pass
+                    proc.stdout.read(1)
+                return None
+
+            content = proc.stdout.read(size)
+            proc.stdout.read(1)  # 跳过内容后的换行符
+        return content
+
+    def close(self):
+        """关闭批量进程"""
+        proc = self._proc
+        if proc.stdin:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+        if proc.stdout:
+            proc.stdout.close()
+        proc.wait()
+
+    def __enter__(self) -> 'BatchCatFile':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
 class GitEngine:
     """Git命令封装引擎"""
 
@@ -36,6 +174,8 @@ class GitEngine:
         self.repo_path = os.path.abspath(repo_path)
         self.portable_git_path = portable_git_path or self._find_portable_git()
         self.git_exe = self._get_git_executable()
+        self._is_repo = None  # validate_repository的成功结果缓存
+        self._repo_root = None  # get_repository_root的结果缓存，会话期间不变
 
     def _find_portable_git(self) -> str:
         """查找PortableGit路径"""
@@ -59,32 +199,102 @@ class GitEngine:
             return self.portable_git_path
         return "git"
 
-    def _run_git_command(self, args: List[str], capture_output: bool = True,
-                        cwd: str = None, timeout: int = 300, binary_mode: bool = False) -> subprocess.CompletedProcess:
-        """执行Git命令"""
+    @functools.cached_property
+    def _git_env(self) -> Dict[str, str]:
+        """Git子进程环境变量，防止任何交互式提示（惰性构建并缓存）"""
+        env = os.environ.copy()
+        env['GIT_CONFIG_NOSYSTEM'] = '1'
+        env['GIT_TERMINAL_PROMPT'] = '0'
+        env['GIT_EDITOR'] = ':'  # 设置为空操作符，防止打开编辑器
+        env['EDITOR'] = ':'
+        env['VISUAL'] = ':'
+        env['GIT_MERGE_TOOL'] = 'merge'
+        env['GIT_MERGE_VERBOSITY'] = '0'
+        env['GIT_PAGER'] = 'cat'  # 防止分页器
+        env['LESS'] = '-FRX'  # 防止less分页器等待
+        env['PAGER'] = 'cat'
+
+        # 确保不会触发交互式配置
+        env['GIT_AUTHOR_NAME'] = 'Git Diff Tool'
+        env['GIT_AUTHOR_EMAIL'] = 'tool@example.com'
+        env['GIT_COMMITTER_NAME'] = 'Git Diff Tool'
+        env['GIT_COMMITTER_EMAIL'] = 'tool@example.com'
+        return env
+
+    def _iter_git_command(self, args: List[str], cwd: str = None):
+        """流式执行Git命令，按\\x00分隔逐条产出字节记录
+
+        相比一次性缓冲整个stdout，内存占用从O(输出总量)降为O(单条记录)，
+        且解析可以与git的输出同时进行。
+        """
         if cwd is None:
             cwd = self.repo_path
 
+        cmd = [self.git_exe] + args
+
         try:
-            # 设置环境变量以防止任何交互式提示
-            env = os.environ.copy()
-            env['GIT_CONFIG_NOSYSTEM'] = '1'
-            env['GIT_TERMINAL_PROMPT'] = '0'
-            env['GIT_EDITOR'] = ':'  # 设置为空操作符，防止打开编辑器
-            env['EDITOR'] = ':'
-            env['VISUAL'] = ':'
-            env['GIT_MERGE_TOOL'] = 'merge'
-            env['GIT_MERGE_VERBOSITY'] = '0'
-            env['GIT_PAGER'] = 'cat'  # 防止分页器
-            env['LESS'] = '-FRX'  # 防止less分页器等待
-            env['PAGER'] = 'cat'
-
-            # 确保不会触发交互式配置
-            env['GIT_AUTHOR_NAME'] = 'Git Diff Tool'
-            env['GIT_AUTHOR_EMAIL'] = 'tool@example.com'
-            env['GIT_COMMITTER_NAME'] = 'Git Diff Tool'
-            env['GIT_COMMITTER_EMAIL'] = 'tool@example.com'
+            proc = subprocess.Popen(
+                cmd,
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                stdin=subprocess.DEVNULL,
+                env=self._git_env,
+                bufsize=1 << 20
+            )
+        except FileNotFoundError:
+            raise Exception(f"Git可执行文件未找到: {self.git_exe}")
+
+        # stderr在独立线程上同步排空：若等stdout读完再读，git刷出的
+        # 警告超过管道缓冲区（约64KB）时双方会互相等待而死锁
+        stderr_chunks = []
 
+        def _drain_stderr():
+            stderr_chunks.append(proc.stderr.read())
+
+        stderr_thread = threading.Thread(target=_drain_stderr, daemon=True)
+        stderr_thread.start()
+
+        buffer = bytearray()
+        while True:
+            chunk = proc.stdout.read(8192)
+            if not chunk:
+                break
+            buffer += chunk
+            start = 0
+            while True:
+                pos = buffer.find(b'\x00', start)
+                if pos == -1:
+                    break
+                yield bytes(buffer[start:pos])
+                start = pos + 1
+            if start:
+                del buffer[:start]
+
+        if buffer:
+            yield bytes(buffer)
+
+        proc.stdout.close()
+        stderr_thread.join()
+        stderr = stderr_chunks[0] if stderr_chunks else b''
+        proc.stderr.close()
+        if proc.wait() != 0:
+            error_msg = stderr.decode('utf-8', errors='replace').strip()
+            if not error_msg:
+                error_msg = f"Git命令返回错误代码: {proc.returncode}"
+            raise Exception(f"Git命令执行失败: {' '.join(args)}\n错误信息: {error_msg}")
+
+    def _run_git_command(self, args: List[str], capture_output: bool = True,
+                        cwd: str = None, timeout: int = 300) -> subprocess.CompletedProcess:
+        """执行Git命令
+
+        统一以字节模式捕获输出，免去对整个stdout的一次性解码；
+        调用方只在真正需要的字段上解码。
+        """
+        if cwd is None:
+            cwd = self.repo_path
+
+        try:
             # 构建完整命令
             cmd = [self.git_exe] + args
 
@@ -92,44 +302,21 @@ class GitEngine:
             if 'show' in args and '--no-pager' not in args:
                 cmd.insert(1, '--no-pager')
 
-            # 对于二进制文件，使用二进制模式
-            if binary_mode:
-                result = subprocess.run(
-                    cmd,
-                    cwd=cwd,
-                    capture_output=True,
-                    text=False,  # 使用二进制模式
-                    env=env,
-                    timeout=timeout,
-                    stdin=subprocess.DEVNULL
-                )
-            else:
-                result = subprocess.run(
-                    cmd,
-                    cwd=cwd,
-                    capture_output=capture_output,
-                    text=True,
-                    encoding='utf-8',
-                    errors='replace',  # 替换无法解码的字符而不是抛出异常
-                    env=env,
-                    timeout=timeout,
-                    stdin=subprocess.DEVNULL
-                )
+            result = subprocess.run(
+                cmd,
+                cwd=cwd,
+                capture_output=capture_output,
+                text=False,  # 字节模式，按需再解码
+                env=self._git_env,
+                timeout=timeout,
+                stdin=subprocess.DEVNULL
+            )
 
             if capture_output and result.returncode != 0:
-                # 处理错误信息（二进制模式时需要特殊处理）
-                if binary_mode:
-                    if result.stderr:
-                        try:
-                            error_msg = result.stderr.decode('utf-8', errors='replace')
-                        except:
-                            error_msg = f"Git命令返回错误代码: {result.returncode}"
-                    else:
-                        error_msg = f"Git命令返回错误代码: {result.returncode}"
-                else:
-                    error_msg = result.stderr or result.stdout
-                    if not error_msg:
-                        error_msg = f"Git命令返回错误代码: {result.returncode}"
+                raw_error = result.stderr or result.stdout or b''
+                error_msg = raw_error.decode('utf-8', errors='replace').strip()
+                if not error_msg:
+                    error_msg = f"Git命令返回错误代码: {result.returncode}"
                 raise Exception(f"Git命令执行失败: {' '.join(args)}\n错误信息: {error_msg}")
 
             return result
@@ -141,14 +328,25 @@ class GitEngine:
 
     def validate_repository(self) -> bool:
         """验证是否为有效的Git仓库"""
+        if self._is_repo:
+            return True
+
+        # 路径本身不存在时直接失败，避免白白启动一个git进程
+        if not os.path.isdir(self.repo_path):
+            return False
+
         git_dir = os.path.join(self.repo_path, '.git')
         if os.path.exists(git_dir):
+            self._is_repo = True
             return True
 
         # 检查是否为git worktree
         try:
             result = self._run_git_command(['rev-parse', '--is-inside-work-tree'])
-            return result.stdout.strip() == 'true'
+            if result.stdout.strip() == b'true':
+                self._is_repo = True
+                return True
+            return False
         except:
             return False
 
@@ -160,59 +358,84 @@ class GitEngine:
         except:
             return False
 
+    def resolve_shas(self, shas: List[str]) -> Dict[str, Optional[str]]:
+        """批量将修订名解析为完整对象SHA（一次cat-file --batch-check子进程）
+
+        相比逐个rev-parse，N个修订只需一次fork/exec。输出行与输入
+        顺序一一对应：存在时为"<完整SHA> <类型> <大小>"，取第一列；
+        不存在时（missing/ambiguous等）为None。HEAD、分支名等可变
+        引用由此固定为具体对象，适合用作缓存键。
+        """
+        shas = list(shas)
+        if not shas:
+            return {}
+        try:
+            result = subprocess.run(
+                [self.git_exe, 'cat-file', '--batch-check'],
+                cwd=self.repo_path,
+                input=("\n".join(shas) + "\n").encode('utf-8'),
+                capture_output=True,
+                timeout=300,
+                env=self._git_env
+            )
+            lines = result.stdout.decode('utf-8', errors='replace').splitlines()
+            resolved = {}
+            for sha, line in zip(shas, lines):
+                # 有效行为"<SHA> <类型> <大小>"，末列是数字；错误行以
+                # missing/ambiguous等错误词结尾。含空白的输入会被git
+                # 原样回显成多个词，不能只按列数判断
+                parts = line.split()
+                if len(parts) >= 3 and parts[-1].isdigit():
+                    resolved[sha] = parts[0]
+                else:
+                    resolved[sha] = None
+            # 输出行数不足时（进程异常退出），余下的按不存在处理
+            for sha in shas[len(lines):]:
+                resolved[sha] = None
+            return resolved
+        except:
+            return {sha: None for sha in shas}
+
+    def validate_shas(self, shas: List[str]) -> Dict[str, bool]:
+        """批量验证多个SHA是否存在（基于resolve_shas的一次子进程）"""
+        return {sha: full is not None for sha, full in self.resolve_shas(shas).items()}
+
     def get_diff_entries(self, old_sha: str, new_sha: str) -> List[DiffEntry]:
-        """获取两个SHA之间的差异文件列表"""
+        """获取两个SHA之间的差异文件列表（流式解析，不整块缓冲）"""
         # 使用--name-status获取状态，-z以null分隔避免文件名空格问题
-        result = self._run_git_command(['diff', '--name-status', '-z', old_sha, new_sha])
-
         entries = []
-        content = result.stdout
-        if not content:
-            return entries
-
-        # 解析-z格式的输出
-        parts = content.split('\x00')
-        i = 0
+        status_line = None
+        old_path = None
 
-        while i < len(parts):
-            if not parts[i]:
-                i += 1
+        # 状态机：等待状态行 -> 等待路径 -> (R/C时)等待新路径
+        for record in self._iter_git_command(['diff', '--name-status', '-z', old_sha, new_sha]):
+            if not record:
                 continue
+            field = record.decode('utf-8', errors='replace')
 
-            # 解析状态行
-            status_line = parts[i]
-            i += 1
-
-            if i >= len(parts):
-                break
-
-            # 文件路径
-            file_path = parts[i]
-            i += 1
-
-            if not file_path:
+            if status_line is None:
+                # 状态行
+                status_line = field
                 continue
 
-            # 解析状态
-            if len(status_line) >= 1:
+            if old_path is None:
+                # 文件路径
+                old_path = field
                 status = status_line[0]
-                old_path = file_path
-                new_path = file_path
 
-                # 处理重命名或复制
+                # 重命名或复制还带有第二个路径字段
                 if status in ('R', 'C'):
-                    # 格式为 R100 old_path new_path
-                    match = re.match(r'^([RC])(\d+)$', status_line)
-                    if match:
-                        similarity = int(match.group(2))
-                        if i < len(parts):
-                            new_path = parts[i]
-                            i += 1
-                        entries.append(DiffEntry(status, old_path, new_path, similarity))
-                    else:
-                        entries.append(DiffEntry(status, old_path, new_path))
-                else:
-                    entries.append(DiffEntry(status, old_path, new_path))
+                    continue
+
+                entries.append(DiffEntry(status, old_path, old_path))
+            else:
+                # R/C的新路径，状态行格式为 R100
+                match = _RC_RE.fullmatch(status_line)
+                similarity = int(match.group(2)) if match else 0
+                entries.append(DiffEntry(status_line[0], old_path, field, similarity))
+
+            status_line = None
+            old_path = None
 
         return entries
 
@@ -221,7 +444,7 @@ class GitEngine:
         try:
             # 使用--no-pager来防止分页器，使用二进制模式处理所有文件
             args = ['--no-pager', 'show', f'{sha}:{file_path}']
-            result = self._run_git_command(args, capture_output=True, timeout=60, binary_mode=True)
+            result = self._run_git_command(args, capture_output=True, timeout=60)
             return result.stdout if result.stdout else b''
         except subprocess.TimeoutExpired:
             raise Exception(f"获取文件内容超时: {file_path}")
@@ -230,20 +453,30 @@ class GitEngine:
                 return b''
             raise Exception(f"获取文件内容失败 {file_path}: {str(e)}")
 
+    def open_batch_reader(self) -> BatchCatFile:
+        """打开长驻的cat-file批量读取器，供调用方跨多次提取复用"""
+        return BatchCatFile(self)
+
+    def get_file_contents(self, pairs) -> 'Iterator[bytes]':
+        """批量获取多个(sha, path)的文件内容，复用单个cat-file进程"""
+        with BatchCatFile(self) as batch:
+            for sha, file_path in pairs:
+                yield batch.fetch(sha, file_path)
+
     def get_submodule_info(self, old_sha: str, new_sha: str) -> List[SubmoduleInfo]:
         """获取子模块变更信息"""
         submodule_info = []
 
         # 获取old_sha的子模块信息
         try:
-            result = self._run_git_command(['ls-tree', '-r', old_sha])
+            result = self._run_git_command(['ls-tree', '-r', '-z', old_sha])
             old_submodules = self._parse_ls_tree_output(result.stdout)
         except:
             old_submodules = {}
 
         # 获取new_sha的子模块信息
         try:
-            result = self._run_git_command(['ls-tree', '-r', new_sha])
+            result = self._run_git_command(['ls-tree', '-r', '-z', new_sha])
             new_submodules = self._parse_ls_tree_output(result.stdout)
         except:
             new_submodules = {}
@@ -266,17 +499,18 @@ class GitEngine:
 
         return submodule_info
 
-    def _parse_ls_tree_output(self, output: str) -> Dict[str, str]:
-        """解析ls-tree输出，返回路径到SHA的映射"""
+    def _parse_ls_tree_output(self, output: bytes) -> Dict[str, str]:
+        """解析ls-tree -z输出（字节），返回路径到SHA的映射"""
+        # 记录格式: mode type sha\t路径，记录间以\x00分隔。
+        # 元数据与路径之间的分隔符是制表符，按\t切一刀即可正确处理含空格的路径
         submodules = {}
-        for line in output.strip().split('\n'):
-            if line:
-                parts = line.split()
-                if len(parts) >= 4 and parts[1] == 'commit':
-                    # 格式: mode type sha path
-                    sha = parts[2]
-                    path = ' '.join(parts[3:])
-                    submodules[path] = sha
+        for record in output.split(b'\x00'):
+            if not record:
+                continue
+            meta, _, path = record.partition(b'\t')
+            parts = meta.split(b' ')
+            if len(parts) >= 3 and parts[1] == b'commit':
+                submodules[path.decode('utf-8')] = parts[2].decode('ascii')
         return submodules
 
     def is_submodule_initialized(self, submodule_path: str) -> bool:
@@ -308,8 +542,18 @@ class GitEngine:
 
     def get_repository_root(self) -> str:
         """获取仓库根目录"""
+        if self._repo_root is not None:
+            return self._repo_root
+
+        # 常见情况：repo_path下直接有.git目录，无需启动git
+        if os.path.isdir(os.path.join(self.repo_path, '.git')):
+            self._repo_root = self.repo_path
+            return self._repo_root
+
+        # worktree或gitdir文件等情况才询问git
         try:
             result = self._run_git_command(['rev-parse', '--show-toplevel'])
-            return result.stdout.strip()
+            self._repo_root = result.stdout.decode('utf-8', errors='replace').strip()
+            return self._repo_root
         except:
             return self.repo_path
\ No newline at end of file
@@ -8,25 +8,64 @@ from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
 import os
 import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional, Dict, Any
 
 from config_manager import ConfigManager
-from git_engine import GitEngine, DiffEntry, SubmoduleInfo
-from file_manager import FileManager
+
+# GitEngine/FileManager延迟到实际使用时再导入，窗口先于
+# git和文件机制的加载出现，缩短冷启动到可见的时间
+
+# 差异状态到提取动作的映射：status → ((版本, 路径属性, 日志标签), ...)。
+# 表驱动代替逐状态的if/elif，消除三处重复的复制逻辑
+_STATUS_PLAN = {
+    'M': (('old', 'old_path', '旧版本'), ('new', 'new_path', '新版本')),
+    'T': (('old', 'old_path', '旧版本'), ('new', 'new_path', '新版本')),
+    'A': (('new', 'new_path', '新文件'),),
+    'D': (('old', 'old_path', '已删除文件'),),
+    'R': (('old', 'old_path', '重命名前'), ('new', 'new_path', '重命名后')),
+    'C': (('old', 'old_path', '重命名前'), ('new', 'new_path', '重命名后')),
+}
+
+# 差异列表中固定的状态描述；R/C的描述依赖相似度，按条目现场格式化
+_STATUS_DESC_STATIC = {
+    'M': '修改',
+    'A': '新增',
+    'D': '删除',
+    'T': '类型变更',
+}
 
 
 class MainWindow:
     """主窗口类"""
 
+    # 日志区域保留的最大行数，超出时丢弃最旧的行，
+    # 避免长时间运行后每次插入的布局成本随缓冲区增长
+    MAX_LOG_LINES = 5000
+
     def __init__(self):
+        from file_manager import FileManager
+
         self.root = tk.Tk()
         self.config_manager = ConfigManager()
         self.file_manager = FileManager()
-        self.git_engine: Optional[GitEngine] = None
-
-        # 工作线程队列
-        self.work_queue = queue.Queue()
-        self.progress_queue = queue.Queue()
+        self.git_engine: Optional["GitEngine"] = None
+        self._engine_repo: Optional[str] = None  # 当前引擎对应的仓库路径
+
+        # 工作线程队列（SimpleQueue无task-tracking开销，put/get更轻）
+        self.work_queue = queue.SimpleQueue()
+        self.progress_queue = queue.SimpleQueue()
+
+        # 差异/子模块查询缓存：键为(repo_path, old_sha, new_sha)。
+        # git结果对固定SHA不可变，常见的“List Diff后再Copy”
+        # 第二次枚举差异就变成了字典查找
+        self._diff_cache: Dict[tuple, list] = {}
+        self._submod_cache: Dict[tuple, list] = {}
+        # 按(sha, path)缓存的小blob内容，大文件不进缓存（直接流式落盘）
+        self._content_cache: Dict[tuple, bytes] = {}
+        # 共享的cat-file批量管道：所有提取共用一个git进程
+        self._batch_reader = None
+        self._batch_lock = threading.Lock()
 
         # 加载配置
         self.config = self.config_manager.load_config()
@@ -36,8 +75,9 @@ class MainWindow:
         self._create_widgets()
         self._load_config_to_ui()
 
-        # 启动进度监控
-        self.root.after(100, self._check_progress_queue)
+        # 进度分发：工作线程通过虚拟事件即时唤醒主循环，
+        # 代替固定100ms的轮询（空闲时零唤醒，繁忙时零延迟）
+        self.root.bind("<<Progress>>", self._drain_progress_queue)
 
     def _setup_window(self):
         """设置窗口属性"""
@@ -133,13 +173,20 @@ class MainWindow:
         self.clear_btn = ttk.Button(button_frame, text="Clear", command=self._clear_inputs)
         self.clear_btn.grid(row=0, column=2, padx=5)
 
+        # 详细日志开关：关闭时跳过逐文件的日志消息，
+        # 大量文件时省去数千次队列投递和文本插入
+        self.verbose_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="详细日志", variable=self.verbose_var).grid(row=0, column=3, padx=5)
+
         # 进度条
         row += 1
         self.progress_var = tk.StringVar(value="就绪")
         ttk.Label(main_frame, textvariable=self.progress_var).grid(row=row, column=0, columnspan=2, sticky=tk.W)
 
         row += 1
-        self.progress_bar = ttk.Progressbar(main_frame, mode='indeterminate')
+        # determinate模式按实际进度绘制，没有indeterminate跑马灯的
+        # 周期性重绘定时器，用户也能看到真实进度
+        self.progress_bar = ttk.Progressbar(main_frame, mode='determinate', maximum=100)
         self.progress_bar.grid(row=row, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
 
         # 输出日志区域
@@ -147,10 +194,18 @@ class MainWindow:
         ttk.Label(main_frame, text="输出日志:").grid(row=row, column=0, sticky=tk.W, pady=(10, 5))
 
         row += 1
-        self.log_text = scrolledtext.ScrolledText(main_frame, height=15, wrap=tk.WORD)
+        self.log_text = scrolledtext.ScrolledText(main_frame, height=15, wrap=tk.WORD, undo=False)
         self.log_text.grid(row=row, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
         main_frame.rowconfigure(row, weight=1)
 
+        # 输入编辑后防抖保存配置：按钮点击不再同步做五次Tcl往返
+        # 加一次写盘，持久化由2秒的防抖定时器和关窗兜底负责
+        self._save_after_id = None
+        for entry in (self.repo_path_entry, self.old_sha_entry, self.new_sha_entry,
+                      self.output_path_entry, self.folder_name_entry):
+            entry.bind("<KeyRelease>", self._schedule_config_save)
+            entry.bind("<FocusOut>", self._schedule_config_save)
+
     def _load_config_to_ui(self):
         """将配置加载到界面"""
         self.repo_path_var.set(self.config.get("repo_path", ""))
@@ -159,6 +214,17 @@ class MainWindow:
         self.output_path_var.set(self.config.get("output_path", ""))
         self.folder_name_var.set(self.config.get("output_folder_name", ""))
 
+    def _schedule_config_save(self, event=None):
+        """输入变化后的防抖配置保存（2秒内的连续编辑合并为一次）"""
+        if self._save_after_id is not None:
+            self.root.after_cancel(self._save_after_id)
+        self._save_after_id = self.root.after(2000, self._flush_config_save)
+
+    def _flush_config_save(self):
+        """防抖定时器到期，执行实际的配置保存"""
+        self._save_after_id = None
+        self._save_config_from_ui()
+
     def _save_config_from_ui(self):
         """从界面保存配置"""
         updates = {
@@ -175,7 +241,6 @@ class MainWindow:
         """在日志区域显示消息"""
         self.log_text.insert(tk.END, f"{message}\n")
         self.log_text.see(tk.END)
-        self.root.update_idletasks()
 
     def _browse_repo_path(self):
         """浏览仓库路径"""
@@ -202,7 +267,7 @@ class MainWindow:
             os.startfile(path)
 
     def _clear_inputs(self):
-        """清空输入框"""
+        """清空输入框并使缓存失效"""
         self.repo_path_var.set("")
         self.old_sha_var.set("")
         self.new_sha_var.set("")
@@ -210,6 +275,14 @@ class MainWindow:
         self.folder_name_var.set("")
         self.log_text.delete(1.0, tk.END)
 
+        # 释放引擎和缓存，下次操作从干净状态开始
+        self._close_batch_reader()
+        self.git_engine = None
+        self._engine_repo = None
+        self._content_cache = {}
+        self._diff_cache.clear()
+        self._submod_cache.clear()
+
     def _validate_inputs(self) -> tuple[bool, str]:
         """验证输入参数"""
         if not self.repo_path_var.get():
@@ -242,60 +315,150 @@ class MainWindow:
             messagebox.showerror("输入错误", error)
             return
 
-        self._log_message("输入验证通过，保存配置")
+        self._log_message("输入验证通过")
 
-        # 保存配置
-        self._save_config_from_ui()
+        # Tk变量只保证在主线程访问安全：启动前在主线程快照，
+        # 以普通字符串参数传入工作线程
+        params = (
+            self.repo_path_var.get(),
+            self.old_sha_var.get(),
+            self.new_sha_var.get(),
+        )
 
         # 在工作线程中执行
         try:
-            thread = threading.Thread(target=self._list_diff_worker, daemon=True)
+            thread = threading.Thread(target=self._list_diff_worker, args=params, daemon=True)
             thread.start()
             self._log_message("List Diff工作线程已启动")
         except Exception as e:
             self._log_message(f"启动List Diff工作线程失败: {e}")
             messagebox.showerror("错误", f"启动工作线程失败: {e}")
 
-    def _list_diff_worker(self):
-        """工作线程：列出差异"""
+    def _list_diff_worker(self, repo_path: str, old_sha: str, new_sha: str):
+        """工作线程：列出差异（参数为主线程快照的输入值）"""
         try:
-            self.progress_queue.put(("start", "正在分析Git差异..."))
+            self._post_progress("start", "正在分析Git差异...")
 
             # 初始化Git引擎
-            self.git_engine = GitEngine(self.repo_path_var.get())
+            self._init_engine(repo_path)
 
             # 验证仓库
             if not self.git_engine.validate_repository():
-                self.progress_queue.put(("error", "无效的Git仓库"))
+                self._post_progress("error", "无效的Git仓库")
                 return
 
-            # 验证SHA
-            old_sha = self.old_sha_var.get()
-            new_sha = self.new_sha_var.get()
-
-            if not self.git_engine.validate_sha(old_sha):
-                self.progress_queue.put(("error", f"Old SHA不存在: {old_sha}"))
+            # 解析并验证SHA（一次批量子进程，代替两次rev-parse）。
+            # 后续统一使用解析出的完整SHA：HEAD/分支名等可变引用
+            # 被固定到具体提交，缓存键不会因仓库新增提交而过期
+            resolved = self.git_engine.resolve_shas([old_sha, new_sha])
+            if not resolved.get(old_sha):
+                self._post_progress("error", f"Old SHA不存在: {old_sha}")
                 return
 
-            if not self.git_engine.validate_sha(new_sha):
-                self.progress_queue.put(("error", f"New SHA不存在: {new_sha}"))
+            if not resolved.get(new_sha):
+                self._post_progress("error", f"New SHA不存在: {new_sha}")
                 return
 
-            # 获取差异
-            diff_entries = self.git_engine.get_diff_entries(old_sha, new_sha)
-            self.progress_queue.put(("log", f"找到 {len(diff_entries)} 个文件变更"))
+            old_sha, new_sha = resolved[old_sha], resolved[new_sha]
+
+            # 获取差异（命中缓存时免去git diff子进程）
+            diff_entries = self._get_diff_entries_cached(repo_path, old_sha, new_sha)
+            self._post_progress("log", f"找到 {len(diff_entries)} 个文件变更")
 
             # 获取子模块信息
-            submodules = self.git_engine.get_submodule_info(old_sha, new_sha)
+            submodules = self._get_submodules_cached(repo_path, old_sha, new_sha)
             if submodules:
-                self.progress_queue.put(("log", f"发现 {len(submodules)} 个子模块变更"))
+                self._post_progress("log", f"发现 {len(submodules)} 个子模块变更")
 
             # 显示差异
-            self.progress_queue.put(("diff_result", diff_entries, submodules))
-            self.progress_queue.put(("complete", "差异分析完成"))
+            self._post_progress("diff_result", diff_entries, submodules)
+            self._post_progress("complete", "差异分析完成")
 
         except Exception as e:
-            self.progress_queue.put(("error", f"分析差异时发生错误: {str(e)}"))
+            self._post_progress("error", f"分析差异时发生错误: {str(e)}")
+
+    def _init_engine(self, repo_path: str):
+        """创建或复用Git引擎
+
+        仓库路径不变时复用现有引擎——其批量管道、内容缓存和
+        validate_repository的已验证状态一并保留，"List Diff后再
+        Copy"不再重复引擎初始化和仓库验证子进程。路径变化时
+        重建引擎并清空所有查询缓存。
+        """
+        if self.git_engine is not None and self._engine_repo == repo_path:
+            return
+
+        from git_engine import GitEngine
+
+        self._close_batch_reader()
+        self.git_engine = GitEngine(repo_path)
+        self._engine_repo = repo_path
+        self._content_cache = {}
+        self._diff_cache.clear()
+        self._submod_cache.clear()
+
+    def _ensure_batch_reader(self):
+        """按需打开共享的cat-file批量管道
+
+        N个文件的提取只需一次git进程启动，而不是每个文件一次
+        git show的fork/exec。
+        """
+        with self._batch_lock:
+            if self._batch_reader is None:
+                self._batch_reader = self.git_engine.open_batch_reader()
+            return self._batch_reader
+
+    def _copy_version(self, sha: str, file_path: str, output_path: str, version: str):
+        """提取单个版本并按目录结构写入输出
+
+        小blob整块读取并按(sha, path)缓存复用（重命名/复制条目、
+        指向相同blob的多个条目免去重复读取）；大blob不经过Python堆，
+        由copy_stream_with_structure直接从git管道分块落盘。
+        """
+        key = (sha, file_path)
+        content = self._content_cache.get(key)
+        if content is None:
+            batch = self._ensure_batch_reader()
+
+            def sink(src, size):
+                self.file_manager.copy_stream_with_structure(
+                    src, size, output_path, file_path, version)
+
+            content = batch.fetch_or_stream(sha, file_path, sink)
+            if content is None:
+                return  # 大文件已在sink中流式写盘
+            if len(self._content_cache) >= 2048:
+                self._content_cache.clear()
+            self._content_cache[key] = content
+        self.file_manager.copy_file_with_structure(content, output_path, file_path, version)
+
+    def _close_batch_reader(self):
+        """关闭共享的cat-file管道（引擎切换或退出时）"""
+        with self._batch_lock:
+            if self._batch_reader is not None:
+                try:
+                    self._batch_reader.close()
+                except Exception:
+                    pass
+                self._batch_reader = None
+
+    def _get_diff_entries_cached(self, repo_path: str, old_sha: str, new_sha: str) -> list:
+        """带缓存的差异枚举"""
+        key = (repo_path, old_sha, new_sha)
+        entries = self._diff_cache.get(key)
+        if entries is None:
+            entries = self.git_engine.get_diff_entries(old_sha, new_sha)
+            self._diff_cache[key] = entries
+        return entries
+
+    def _get_submodules_cached(self, repo_path: str, old_sha: str, new_sha: str) -> list:
+        """带缓存的子模块变更枚举"""
+        key = (repo_path, old_sha, new_sha)
+        submodules = self._submod_cache.get(key)
+        if submodules is None:
+            submodules = self.git_engine.get_submodule_info(old_sha, new_sha)
+            self._submod_cache[key] = submodules
+        return submodules
 
     def _copy_files(self):
         """复制文件"""
@@ -309,10 +472,6 @@ class MainWindow:
 
         self._log_message("输入验证通过")
 
-        # 保存配置
-        self._save_config_from_ui()
-        self._log_message("配置已保存")
-
         # 确认操作
         response = messagebox.askyesno(
             "确认操作",
@@ -327,131 +486,151 @@ class MainWindow:
 
         self._log_message("用户确认操作，开始启动工作线程")
 
+        # Tk变量只保证在主线程访问安全：启动前在主线程快照，
+        # 以普通字符串参数传入工作线程
+        params = (
+            self.repo_path_var.get(),
+            self.old_sha_var.get(),
+            self.new_sha_var.get(),
+            self.output_path_var.get(),
+            self.folder_name_var.get(),
+            self.verbose_var.get(),
+        )
+
         # 在工作线程中执行
         try:
-            thread = threading.Thread(target=self._copy_files_worker, daemon=True)
+            thread = threading.Thread(target=self._copy_files_worker, args=params, daemon=True)
             thread.start()
             self._log_message("工作线程已启动")
         except Exception as e:
             self._log_message(f"启动工作线程失败: {e}")
             messagebox.showerror("错误", f"启动工作线程失败: {e}")
 
-    def _copy_files_worker(self):
-        """工作线程：复制文件"""
+    def _copy_files_worker(self, repo_path: str, old_sha: str, new_sha: str,
+                           output_path: str, folder_name: str, verbose: bool = False):
+        """工作线程：复制文件（参数为主线程快照的输入值）"""
         try:
-            self.progress_queue.put(("start", "开始提取文件..."))
+            self._post_progress("start", "开始提取文件...")
+
+            # 重置统计和目录缓存，上一次复制的状态不带入本次
+            self.file_manager.reset_statistics()
 
             # 初始化Git引擎
-            self.git_engine = GitEngine(self.repo_path_var.get())
+            self._init_engine(repo_path)
 
             # 验证仓库
             if not self.git_engine.validate_repository():
-                self.progress_queue.put(("error", "无效的Git仓库"))
+                self._post_progress("error", "无效的Git仓库")
+                return
+
+            # 与List Diff一致：解析为完整SHA后再查缓存和提取，
+            # 输入HEAD/分支名时不会命中指向旧提交的缓存结果
+            resolved = self.git_engine.resolve_shas([old_sha, new_sha])
+            if not resolved.get(old_sha):
+                self._post_progress("error", f"Old SHA不存在: {old_sha}")
                 return
 
-            # 获取参数
-            old_sha = self.old_sha_var.get()
-            new_sha = self.new_sha_var.get()
-            output_path = self.output_path_var.get()
-            folder_name = self.folder_name_var.get()
+            if not resolved.get(new_sha):
+                self._post_progress("error", f"New SHA不存在: {new_sha}")
+                return
+
+            old_sha, new_sha = resolved[old_sha], resolved[new_sha]
 
             # 准备输出目录
             success, error = self.file_manager.prepare_output_directory(output_path, folder_name)
             if not success:
-                self.progress_queue.put(("error", error))
+                self._post_progress("error", error)
                 return
 
             full_output_path = os.path.join(output_path, folder_name)
 
-            # 获取差异
-            diff_entries = self.git_engine.get_diff_entries(old_sha, new_sha)
-            self.progress_queue.put(("log", f"找到 {len(diff_entries)} 个文件变更"))
+            # 获取差异（List Diff后再Copy时直接命中缓存）
+            diff_entries = self._get_diff_entries_cached(repo_path, old_sha, new_sha)
+            self._post_progress("log", f"找到 {len(diff_entries)} 个文件变更")
+            self._post_progress("progress_init", len(diff_entries))
 
             # 处理普通文件
-            self._process_diff_files(diff_entries, old_sha, new_sha, full_output_path)
+            self._process_diff_files(diff_entries, old_sha, new_sha, full_output_path, verbose)
 
             # 处理子模块
-            submodules = self.git_engine.get_submodule_info(old_sha, new_sha)
+            submodules = self._get_submodules_cached(repo_path, old_sha, new_sha)
             for submodule in submodules:
-                self.progress_queue.put(("log", f"处理子模块: {submodule.path}"))
+                self._post_progress("log", f"处理子模块: {submodule.path}")
                 self._process_submodule(submodule, full_output_path)
 
             # 显示统计信息
             stats = self.file_manager.get_statistics()
-            self.progress_queue.put(("log", f"复制完成: 成功 {stats['copied_files']} 个文件"))
+            self._post_progress("log", f"复制完成: 成功 {stats['copied_files']} 个文件")
             if stats['failed_files']:
-                self.progress_queue.put(("log", f"失败 {stats['failed_files_count']} 个文件"))
+                self._post_progress("log", f"失败 {stats['failed_files_count']} 个文件")
 
-            self.progress_queue.put(("complete", "文件提取完成"))
+            self._post_progress("complete", "文件提取完成")
 
         except Exception as e:
-            self.progress_queue.put(("error", f"提取文件时发生错误: {str(e)}"))
+            self._post_progress("error", f"提取文件时发生错误: {str(e)}")
+
+    def _process_diff_files(self, diff_entries: list, old_sha: str, new_sha: str,
+                            output_path: str, verbose: bool = False):
+        """处理差异文件（线程池并行提取）
 
-    def _process_diff_files(self, diff_entries: list, old_sha: str, new_sha: str, output_path: str):
-        """处理差异文件"""
+        git子进程和磁盘写入都会释放GIL，并行能让提取与写盘互相重叠。
+        逐文件的日志只在verbose开启时发送（失败消息始终发送），
+        进度以约1%的粒度上报，避免消息量随文件数线性膨胀。
+        """
         total_files = len(diff_entries)
         processed_files = 0
+        progress_step = max(1, total_files // 100)
 
-        for entry in diff_entries:
-            try:
+        max_workers = min(32, (os.cpu_count() or 4) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(self._extract_one, entry, old_sha, new_sha, output_path, verbose): entry
+                for entry in diff_entries
+            }
+            for future in as_completed(futures):
                 processed_files += 1
-                self.progress_queue.put(("log", f"处理文件 {processed_files}/{total_files}: {entry.new_path}"))
-
-                if entry.status in ['M', 'T']:  # 修改或类型变更
-                    # 复制old版本
-                    self.progress_queue.put(("log", f"  获取旧版本: {entry.old_path}"))
-                    old_content = self.git_engine.get_file_content(old_sha, entry.old_path)
-                    self.file_manager.copy_file_with_structure(old_content, output_path, entry.old_path, "old")
-
-                    # 复制new版本
-                    self.progress_queue.put(("log", f"  获取新版本: {entry.new_path}"))
-                    new_content = self.git_engine.get_file_content(new_sha, entry.new_path)
-                    self.file_manager.copy_file_with_structure(new_content, output_path, entry.new_path, "new")
-
-                elif entry.status == 'A':  # 新增
-                    # 只复制new版本
-                    self.progress_queue.put(("log", f"  获取新文件: {entry.new_path}"))
-                    new_content = self.git_engine.get_file_content(new_sha, entry.new_path)
-                    self.file_manager.copy_file_with_structure(new_content, output_path, entry.new_path, "new")
-
-                elif entry.status == 'D':  # 删除
-                    # 只复制old版本
-                    self.progress_queue.put(("log", f"  获取已删除文件: {entry.old_path}"))
-                    old_content = self.git_engine.get_file_content(old_sha, entry.old_path)
-                    self.file_manager.copy_file_with_structure(old_content, output_path, entry.old_path, "old")
-
-                elif entry.status in ['R', 'C']:  # 重命名或复制
-                    # 复制old路径
-                    self.progress_queue.put(("log", f"  获取重命名前: {entry.old_path}"))
-                    old_content = self.git_engine.get_file_content(old_sha, entry.old_path)
-                    self.file_manager.copy_file_with_structure(old_content, output_path, entry.old_path, "old")
-
-                    # 复制new路径
-                    self.progress_queue.put(("log", f"  获取重命名后: {entry.new_path}"))
-                    new_content = self.git_engine.get_file_content(new_sha, entry.new_path)
-                    self.file_manager.copy_file_with_structure(new_content, output_path, entry.new_path, "new")
-
-                self.progress_queue.put(("log", f"  ✅ 完成: {entry.new_path or entry.old_path}"))
-
-            except Exception as e:
-                error_msg = f"处理文件失败: {entry.new_path or entry.old_path} - {str(e)}"
-                self.progress_queue.put(("log", f"  ❌ {error_msg}"))
-                self.file_manager.failed_files.append((entry.new_path or entry.old_path, str(e)))
-                # 继续处理下一个文件，不中断整个过程
-
-    def _process_submodule(self, submodule: SubmoduleInfo, output_path: str):
+                success, error, display_path = future.result()
+                if success:
+                    if verbose:
+                        self._post_progress("log", f"处理文件 {processed_files}/{total_files}: {display_path}")
+                        self._post_progress("log", f"  ✅ 完成: {display_path}")
+                else:
+                    self._post_progress("log", f"  ❌ 处理文件失败: {display_path} - {error}")
+                    self.file_manager.record_failure(display_path, error)
+                    # 继续处理下一个文件，不中断整个过程
+                if processed_files % progress_step == 0 or processed_files == total_files:
+                    self._post_progress("progress", processed_files, total_files)
+
+    def _extract_one(self, entry: "DiffEntry", old_sha: str, new_sha: str,
+                     output_path: str, verbose: bool = False) -> tuple[bool, str, str]:
+        """提取单个差异条目的旧/新版本，返回(是否成功, 错误信息, 展示路径)"""
+        display_path = entry.new_path or entry.old_path
+        try:
+            for version, path_attr, label in _STATUS_PLAN.get(entry.status, ()):
+                sha = old_sha if version == 'old' else new_sha
+                path = getattr(entry, path_attr)
+                if verbose:
+                    self._post_progress("log", f"  获取{label}: {path}")
+                self._copy_version(sha, path, output_path, version)
+
+            return True, "", display_path
+
+        except Exception as e:
+            return False, str(e), display_path
+
+    def _process_submodule(self, submodule: "SubmoduleInfo", output_path: str):
         """处理子模块"""
         try:
             # 检查子模块是否已初始化
             if not self.git_engine.is_submodule_initialized(submodule.path):
-                self.progress_queue.put(("error", f"子模块未初始化或未拉取代码: {submodule.path}"))
+                self._post_progress("error", f"子模块未初始化或未拉取代码: {submodule.path}")
                 return
 
             # 获取子模块的Git引擎
             sub_engine = self.git_engine.get_submodule_engine(submodule.path)
 
             if not sub_engine.validate_repository():
-                self.progress_queue.put(("error", f"子模块不是有效的Git仓库: {submodule.path}"))
+                self._post_progress("error", f"子模块不是有效的Git仓库: {submodule.path}")
                 return
 
             # 获取子模块差异
@@ -460,13 +639,17 @@ class MainWindow:
                 submodule.new_commit or submodule.new_sha
             )
 
-            self.progress_queue.put(("log", f"子模块 {submodule.path} 包含 {len(sub_diff_entries)} 个变更"))
+            self._post_progress("log", f"子模块 {submodule.path} 包含 {len(sub_diff_entries)} 个变更")
+
+            # 子模块前缀在循环外拼好；os.path.join每次都做分隔符和
+            # 绝对路径检查，纯字符串拼接在大量条目时更省
+            prefix = submodule.path.rstrip('/\\') + os.sep
 
             # 处理子模块文件，保持原有目录结构
             for entry in sub_diff_entries:
                 # 映射到主项目的路径
-                mapped_old_path = os.path.join(submodule.path, entry.old_path)
-                mapped_new_path = os.path.join(submodule.path, entry.new_path)
+                mapped_old_path = prefix + entry.old_path
+                mapped_new_path = prefix + entry.new_path
 
                 if entry.status in ['M', 'T']:
                     old_content = sub_engine.get_file_content(submodule.old_commit, entry.old_path)
@@ -484,26 +667,72 @@ class MainWindow:
                     self.file_manager.copy_file_with_structure(old_content, output_path, mapped_old_path, "old")
 
         except Exception as e:
-            self.progress_queue.put(("error", f"处理子模块 {submodule.path} 时发生错误: {str(e)}"))
+            self._post_progress("error", f"处理子模块 {submodule.path} 时发生错误: {str(e)}")
 
-    def _check_progress_queue(self):
-        """检查进度队列"""
+    def _post_progress(self, *item):
+        """投递进度消息并唤醒主循环（可从工作线程调用）
+
+        event_generate(when='tail')是Tcl文档认可的跨线程通知方式。
+        """
+        self.progress_queue.put(item)
         try:
-            while True:
-                item = self.progress_queue.get_nowait()
-                self._handle_progress_item(item)
-        except queue.Empty:
+            self.root.event_generate("<<Progress>>", when="tail")
+        except tk.TclError:
+            # 窗口已销毁，消息无人消费也无妨
             pass
 
-        # 继续检查
-        self.root.after(100, self._check_progress_queue)
+    def _drain_progress_queue(self, event=None):
+        """排空进度队列（由<<Progress>>虚拟事件触发）
+
+        日志消息先在本地累积，排空后合并为一次insert——
+        N条日志只做一次Tk布局和滚动，而不是N次。
+        每次调用最多处理256项，剩余的重新排队到下一轮事件，
+        突发的消息洪峰不会让主循环长时间拿不到控制权。
+        """
+        log_batch = []
+        inserted = False
+
+        def flush_logs():
+            # 一段连续的日志合并为一次insert；在处理控制消息前先落盘，
+            # 显示顺序与队列顺序保持一致
+            nonlocal inserted
+            if log_batch:
+                self.log_text.insert(tk.END, "\n".join(log_batch) + "\n")
+                log_batch.clear()
+                inserted = True
+
+        for _ in range(256):
+            try:
+                item = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == "log":
+                log_batch.append(item[1])
+            else:
+                flush_logs()
+                self._handle_progress_item(item)
+        else:
+            # 队列可能还有剩余，空闲时再触发一轮排空
+            self.root.after_idle(
+                lambda: self.root.event_generate("<<Progress>>", when="tail"))
+
+        flush_logs()
+        if inserted:
+            self._trim_log()
+            self.log_text.see(tk.END)
+
+    def _trim_log(self):
+        """按环形缓冲策略裁掉最旧的日志行，保持追加成本为O(1)"""
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > self.MAX_LOG_LINES:
+            self.log_text.delete('1.0', f'{line_count - self.MAX_LOG_LINES}.0')
 
     def _handle_progress_item(self, item):
         """处理进度队列项目"""
         if item[0] == "start":
             status = item[1]
             self.progress_var.set(status)
-            self.progress_bar.start()
+            self.progress_bar['value'] = 0
             self._log_message(f"开始: {status}")
 
         elif item[0] == "log":
@@ -513,16 +742,25 @@ class MainWindow:
         elif item[0] == "error":
             error = item[1]
             self.progress_var.set("错误")
-            self.progress_bar.stop()
             self._log_message(f"错误: {error}")
             messagebox.showerror("错误", error)
 
         elif item[0] == "complete":
             message = item[1]
             self.progress_var.set("完成")
-            self.progress_bar.stop()
+            self.progress_bar['value'] = self.progress_bar['maximum']
             self._log_message(f"完成: {message}")
 
+        elif item[0] == "progress_init":
+            total = item[1]
+            self.progress_bar['maximum'] = max(1, total)
+            self.progress_bar['value'] = 0
+
+        elif item[0] == "progress":
+            processed, total = item[1], item[2]
+            self.progress_bar['value'] = processed
+            self.progress_var.set(f"处理中: {processed}/{total}")
+
         elif item[0] == "diff_result":
             diff_entries, submodules = item[1], item[2]
             self._show_diff_result(diff_entries, submodules)
@@ -541,34 +779,33 @@ class MainWindow:
         text_widget = scrolledtext.ScrolledText(text_frame, wrap=tk.WORD)
         text_widget.pack(fill=tk.BOTH, expand=True)
 
-        # 显示差异文件
-        text_widget.insert(tk.END, f"=== 差异文件列表 (共 {len(diff_entries)} 个文件) ===\n\n")
-
+        # 整份报告先在Python侧拼好，最后一次insert——
+        # N个条目只触发一次Tk文本布局，而不是N次
+        parts = [f"=== 差异文件列表 (共 {len(diff_entries)} 个文件) ===\n\n"]
         for entry in diff_entries:
-            status_desc = {
-                'M': '修改',
-                'A': '新增',
-                'D': '删除',
-                'T': '类型变更',
-                'R': f'重命名 ({entry.similarity}%)',
-                'C': f'复制 ({entry.similarity}%)'
-            }
-
-            desc = status_desc.get(entry.status, entry.status)
-            text_widget.insert(tk.END, f"{desc:8} {entry.new_path}\n")
+            if entry.status == 'R':
+                desc = f'重命名 ({entry.similarity}%)'
+            elif entry.status == 'C':
+                desc = f'复制 ({entry.similarity}%)'
+            else:
+                desc = _STATUS_DESC_STATIC.get(entry.status, entry.status)
+            parts.append(f"{desc:8} {entry.new_path}\n")
 
         # 显示子模块
         if submodules:
-            text_widget.insert(tk.END, f"\n=== 子模块变更 (共 {len(submodules)} 个) ===\n\n")
+            parts.append(f"\n=== 子模块变更 (共 {len(submodules)} 个) ===\n\n")
             for submodule in submodules:
-                text_widget.insert(tk.END, f"子模块变更: {submodule.path}\n")
-                text_widget.insert(tk.END, f"  旧SHA: {submodule.old_commit or 'N/A'}\n")
-                text_widget.insert(tk.END, f"  新SHA: {submodule.new_commit or 'N/A'}\n")
+                parts.append(f"子模块变更: {submodule.path}\n")
+                parts.append(f"  旧SHA: {submodule.old_commit or 'N/A'}\n")
+                parts.append(f"  新SHA: {submodule.new_commit or 'N/A'}\n")
 
+        text_widget.insert(tk.END, "".join(parts))
         text_widget.config(state=tk.DISABLED)
 
     def _on_closing(self):
         """窗口关闭事件"""
+        # 关闭共享的git管道
+        self._close_batch_reader()
         # 保存配置
         self._save_config_from_ui()
         # 关闭窗口
@@ -15,15 +15,9 @@ if current_dir not in sys.path:
 def main():
     """主函数"""
     try:
-        print("正在导入GUI模块...")
         from gui_window import MainWindow
-        print("GUI模块导入成功")
 
-        print("正在创建主窗口...")
         app = MainWindow()
-        print("主窗口创建成功")
-
-        print("正在启动GUI应用...")
         app.run()
     except KeyboardInterrupt:
         print("\n程序被用户中断")